@@ -0,0 +1,320 @@
+from fastapi import HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+import aiomysql
+import asyncio
+import os
+from dotenv import load_dotenv
+from book_cache import cache_from_env
+from http_cache import TableVersion
+from book_query import BookFilter, BOOK_INDEXES, EXISTING_INDEXES_QUERY, build_list_query
+from dataloader import DataLoader
+from group_commit import AsyncGroupCommitter, settings_from_env
+from custom_logging import setup_logging
+
+# Setup logging
+logger = setup_logging()
+
+# Load environment variables
+load_dotenv()
+
+# Pagination and streaming limits for the book listing
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+# Largest number of books accepted by one batch call or IN query
+MAX_BATCH_SIZE = 500
+
+ADD_BOOK_QUERY = "INSERT INTO books (id, title, author, published_date, genre) VALUES (%s, %s, %s, %s, %s)"
+UPDATE_BOOK_QUERY = "UPDATE books SET title = %s, author = %s, published_date = %s, genre = %s WHERE id = %s"
+DELETE_BOOK_QUERY = "DELETE FROM books WHERE id = %s"
+
+def _book_to_dict(book):
+    return {"id": book[0], "title": book[1], "author": book[2], "published_date": book[3], "genre": book[4]}
+
+def _placeholders(count: int):
+    return ", ".join(["%s"] * count)
+
+def _result(book_id: int, status: int, message: str):
+    return {"id": book_id, "status": status, "message": message}
+
+class Book(BaseModel):
+    title: str
+    author: str
+    published_date: str = None
+    genre: str = None
+
+class BookRecord(Book):
+    id: int
+
+class DatabaseManager:
+    def __init__(self):
+        self.pool = None
+        # Optional read-through cache for get_book_by_id
+        self.cache = cache_from_env()
+        # Bumped on every write; read routes only reuse responses cached under the current value
+        self.table_version = TableVersion()
+        # Single-id reads made in the same loop tick share one IN query
+        self._loader = DataLoader(self._fetch_books_by_ids, max_batch_size=MAX_BATCH_SIZE)
+        # Opt-in write-behind: single-book writes share one transaction per batch
+        settings = settings_from_env()
+        self.group_commit = AsyncGroupCommitter(self._write_batch, **settings) if settings else None
+
+    async def init(self):
+        """Initialize the database connection pool."""
+        try:
+            self.pool = await aiomysql.create_pool(
+                host=os.getenv('Host'),
+                user=os.getenv('User'),
+                password=os.getenv('Password'),
+                db=os.getenv('Database'),
+                autocommit=True
+            )
+            logger.info("Database connection pool established.")
+        except Exception as e:
+            logger.error(f"Database connection error: {e}")
+            raise HTTPException(status_code=500, detail=f"Database connection error: {e}")
+
+    async def close(self):
+        """Close the connection pool."""
+        if self.group_commit is not None:
+            await self.group_commit.close()
+        if self.pool:
+            self.pool.close()
+            await self.pool.wait_closed()
+            logger.info("Database connection pool closed.")
+
+    def cache_stats(self):
+        """Return hit, miss and eviction counters of the book cache."""
+        return self.cache.stats() if self.cache else {"enabled": False}
+
+    def _invalidate(self, book_id: int):
+        self.table_version.bump()
+        if self.cache:
+            self.cache.invalidate(book_id)
+
+    async def create_table(self):
+        """Create books table if not exists."""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                query = """
+                CREATE TABLE IF NOT EXISTS books (
+                    id INT PRIMARY KEY,
+                    title VARCHAR(255) NOT NULL,
+                    author VARCHAR(255) NOT NULL,
+                    published_date DATE,
+                    genre VARCHAR(100)
+                );
+                """
+                await cursor.execute(query)
+                # Add the secondary and FULLTEXT indexes missing from older tables
+                await cursor.execute(EXISTING_INDEXES_QUERY)
+                existing = {row[0] for row in await cursor.fetchall()}
+                for name, statement in BOOK_INDEXES.items():
+                    if name not in existing:
+                        await cursor.execute(statement)
+                        logger.info(f"Created index {name} on books.")
+                logger.info("Books table created or already exists.")
+
+    async def add_book(self, book_id: int, book: Book):
+        """Add a book to the database."""
+        return await self._write(("add", book_id, book))
+
+    async def get_book_by_id(self, book_id: int):
+        """Retrieve a book by its ID, through the cache when enabled."""
+        if self.cache is None:
+            return await self._fetch_book(book_id)
+        return await self.cache.aget_or_load(book_id, lambda: self._fetch_book(book_id))
+
+    async def _fetch_book(self, book_id: int):
+        """Read a book row through the batching loader."""
+        try:
+            book = await asyncio.shield(self._loader.load(book_id))
+        except KeyError:
+            logger.warning(f"Book not found (ID: {book_id}).")
+            raise HTTPException(status_code=404, detail="Book not found.")
+        logger.info(f"Book retrieved: {book['title']} (ID: {book_id})")
+        return book
+
+    async def _fetch_books_by_ids(self, book_ids: List[int]):
+        """Read many book rows with one IN query, keyed by ID."""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                query = f"SELECT * FROM books WHERE id IN ({_placeholders(len(book_ids))})"
+                await cursor.execute(query, book_ids)
+                books = await cursor.fetchall()
+                return {book[0]: _book_to_dict(book) for book in books}
+
+    async def get_books_by_ids(self, book_ids: List[int]):
+        """Retrieve many books at once, with a result per requested ID."""
+        found = await self._fetch_books_by_ids(list(set(book_ids))) if book_ids else {}
+        logger.info(f"Retrieved {len(found)} of {len(book_ids)} requested books.")
+        return [
+            {"id": book_id, "status": 200, "book": found[book_id]} if book_id in found
+            else _result(book_id, 404, "Book not found.")
+            for book_id in book_ids
+        ]
+
+    async def add_books(self, books: List[BookRecord], upsert: bool = False):
+        """Insert, or with upsert also update, many books in one transaction."""
+        results, rows, seen = [], [], set()
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await conn.begin()
+                try:
+                    ids = list({book.id for book in books})
+                    existing = set()
+                    if ids:
+                        # Lock the rows, and the gaps of missing IDs, until commit so a concurrent
+                        # insert can't turn a 201 below into a duplicate-key failure
+                        await cursor.execute(f"SELECT id FROM books WHERE id IN ({_placeholders(len(ids))}) FOR UPDATE", ids)
+                        existing = {row[0] for row in await cursor.fetchall()}
+                    for book in books:
+                        if book.id in seen:
+                            results.append(_result(book.id, 400, "Duplicate book ID in batch."))
+                        elif book.id in existing and not upsert:
+                            results.append(_result(book.id, 409, "Book already exists."))
+                        elif book.id in existing:
+                            results.append(_result(book.id, 200, "Book updated successfully."))
+                        else:
+                            results.append(_result(book.id, 201, "Book added successfully."))
+                        if results[-1]["status"] < 400:
+                            rows.append((book.id, book.title, book.author, book.published_date, book.genre))
+                        seen.add(book.id)
+                    if rows:
+                        query = ADD_BOOK_QUERY
+                        if upsert:
+                            query += """
+                            ON DUPLICATE KEY UPDATE title = VALUES(title), author = VALUES(author),
+                            published_date = VALUES(published_date), genre = VALUES(genre)
+                            """
+                        await cursor.executemany(query, rows)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+                for row in rows:
+                    self._invalidate(row[0])
+                logger.info(f"Batch wrote {len(rows)} of {len(books)} books.")
+                return results
+
+    async def delete_books_by_ids(self, book_ids: List[int]):
+        """Delete many books in one transaction, with a result per requested ID."""
+        ids = list(set(book_ids))
+        existing = set()
+        if ids:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await conn.begin()
+                    try:
+                        await cursor.execute(f"SELECT id FROM books WHERE id IN ({_placeholders(len(ids))}) FOR UPDATE", ids)
+                        existing = {row[0] for row in await cursor.fetchall()}
+                        if existing:
+                            await cursor.execute(f"DELETE FROM books WHERE id IN ({_placeholders(len(existing))})", list(existing))
+                        await conn.commit()
+                    except Exception:
+                        await conn.rollback()
+                        raise
+            for book_id in existing:
+                self._invalidate(book_id)
+        logger.info(f"Batch deleted {len(existing)} of {len(book_ids)} books.")
+        return [
+            _result(book_id, 200, "Book deleted successfully.") if book_id in existing
+            else _result(book_id, 404, "Book not found.")
+            for book_id in book_ids
+        ]
+
+    async def update_book_by_id(self, book_id: int, book: Book):
+        """Update a book by its ID."""
+        return await self._write(("update", book_id, book))
+
+    async def delete_book_by_id(self, book_id: int):
+        """Delete a book by its ID."""
+        return await self._write(("delete", book_id, None))
+
+    async def _write(self, operation):
+        """Run one write now, or queue it for the next group commit when WriteBehind is on."""
+        if self.group_commit is not None:
+            return await self.group_commit.submit(operation)
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                value, error = await self._apply_write(cursor, operation)
+        if error is not None:
+            raise error
+        self._invalidate(operation[1])
+        return value
+
+    async def _apply_write(self, cursor, operation):
+        """Execute one queued write; returns (value, error) with a missing row as a 404 error."""
+        kind, book_id, book = operation
+        if kind == "add":
+            await cursor.execute(ADD_BOOK_QUERY, (book_id, book.title, book.author, book.published_date, book.genre))
+            logger.info(f"Book added: {book.title} (ID: {book_id})")
+            return {"message": "Book added successfully."}, None
+        if kind == "update":
+            await cursor.execute(UPDATE_BOOK_QUERY, (book.title, book.author, book.published_date, book.genre, book_id))
+            if cursor.rowcount == 0:
+                logger.warning(f"Book not found for update (ID: {book_id}).")
+                return None, HTTPException(status_code=404, detail="Book not found.")
+            logger.info(f"Book updated: {book.title} (ID: {book_id})")
+            return {"message": "Book updated successfully."}, None
+        await cursor.execute(DELETE_BOOK_QUERY, (book_id,))
+        if cursor.rowcount == 0:
+            logger.warning(f"Book not found for deletion (ID: {book_id}).")
+            return None, HTTPException(status_code=404, detail="Book not found.")
+        logger.info(f"Book deleted (ID: {book_id})")
+        return {"message": "Book deleted successfully."}, None
+
+    async def _write_batch(self, operations):
+        """Apply queued writes in one transaction, with a (value, error) pair per write."""
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await conn.begin()
+                    try:
+                        results = [await self._apply_write(cursor, operation) for operation in operations]
+                        await conn.commit()
+                    except Exception:
+                        await conn.rollback()
+                        raise
+        except (aiomysql.IntegrityError, aiomysql.DataError) as e:
+            if len(operations) == 1:
+                return [(None, e)]
+            # One bad write (say a duplicate ID) must not fail the rest: redo each on its own.
+            # Anything else, like a lost connection, propagates and fails the batch once.
+            logger.warning(f"Group commit of {len(operations)} writes failed ({e}); retrying one at a time.")
+            return [(await self._write_batch([operation]))[0] for operation in operations]
+        # A missing row changed nothing, so it must not move the version or the cache
+        for operation, (_, error) in zip(operations, results):
+            if error is None:
+                self._invalidate(operation[1])
+        logger.info(f"Group commit wrote {len(operations)} books.")
+        return results
+
+    async def display_all_books(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                                filters: Optional[BookFilter] = None, cursor: Optional[str] = None):
+        """Retrieve one filtered, sorted keyset page of books."""
+        query, params = build_list_query(filters, limit=limit, after=after, cursor=cursor)
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as db_cursor:
+                await db_cursor.execute(query, params)
+                books = await db_cursor.fetchall()
+                logger.info("Retrieved all books.")
+                return [_book_to_dict(book) for book in books]
+
+    async def stream_all_books(self, chunk_size: int = STREAM_CHUNK_SIZE, filters: Optional[BookFilter] = None):
+        """Yield every matching book through an unbuffered server-side cursor."""
+        query, params = build_list_query(filters)
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(query, params)
+                while True:
+                    books = await cursor.fetchmany(chunk_size)
+                    if not books:
+                        break
+                    for book in books:
+                        yield _book_to_dict(book)
+                logger.info("Streamed all books.")
+
+db_manager = DatabaseManager()
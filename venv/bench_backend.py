@@ -0,0 +1,213 @@
+"""SQLite stand-in for mysql.connector and aiomysql, used by benchmark.py.
+
+install() swaps ``mysql.connector.connect`` and ``aiomysql.create_pool`` for
+versions backed by one SQLite file, so service.py and async_service.py run
+their own SQL unchanged without a MySQL server. The MySQL-only bits of that
+SQL (upserts, FOR UPDATE, index discovery, FULLTEXT) are rewritten by
+translate().
+"""
+import asyncio
+import re
+import sqlite3
+import aiomysql
+import mysql.connector
+
+_DUPLICATE_KEY = re.compile(r"ON DUPLICATE KEY UPDATE(.*)$", re.IGNORECASE | re.DOTALL)
+_VALUES_REF = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+_MATCH = re.compile(r"MATCH\((\w+), (\w+)\) AGAINST \(\? IN NATURAL LANGUAGE MODE\)", re.IGNORECASE)
+
+
+def translate(query: str) -> str:
+    """Rewrite a MySQL statement from the services into SQLite syntax."""
+    query = query.replace("%s", "?")
+    if "information_schema.statistics" in query:
+        return "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'books'"
+    if re.match(r"\s*CREATE FULLTEXT INDEX", query, re.IGNORECASE):
+        # No FULLTEXT in SQLite; MATCH below falls back to a substring scan
+        return "SELECT 1"
+    query = _MATCH.sub(r"(\1 || ' ' || \2) LIKE '%' || ? || '%'", query)
+    query = re.sub(r"\s+FOR UPDATE\s*$", "", query.strip(), flags=re.IGNORECASE)
+    match = _DUPLICATE_KEY.search(query)
+    if match:
+        assignments = _VALUES_REF.sub(r"excluded.\1", match.group(1))
+        query = query[:match.start()] + f"ON CONFLICT(id) DO UPDATE SET {assignments}"
+    return query
+
+
+def _connect(path: str, autocommit: bool):
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    if autocommit:
+        connection.isolation_level = None
+    return connection
+
+
+class Cursor:
+    """DB-API cursor in the shape of mysql.connector's, on top of sqlite3."""
+
+    # Constraint violations surface as the driver's own exception, as with MySQL
+    integrity_error = mysql.connector.IntegrityError
+
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=()):
+        try:
+            self._cursor.execute(translate(query), tuple(params or ()))
+        except sqlite3.IntegrityError as e:
+            raise self.integrity_error(str(e)) from e
+
+    def executemany(self, query, rows):
+        try:
+            self._cursor.executemany(translate(query), rows)
+        except sqlite3.IntegrityError as e:
+            raise self.integrity_error(str(e)) from e
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """Stand-in for a mysql.connector connection (autocommit off)."""
+
+    def __init__(self, path: str):
+        self._connection = _connect(path, autocommit=False)
+
+    def cursor(self, **kwargs):
+        return Cursor(self._connection)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def is_connected(self):
+        return True
+
+    def ping(self, **kwargs):
+        pass
+
+    def close(self):
+        self._connection.close()
+
+
+class AsyncCursor:
+    """aiomysql-style cursor; SQLite calls run in a worker thread like network I/O would."""
+
+    def __init__(self, connection):
+        self._cursor = Cursor(connection)
+        self._cursor.integrity_error = aiomysql.IntegrityError
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._cursor.close()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    async def execute(self, query, params=()):
+        await asyncio.to_thread(self._cursor.execute, query, params)
+
+    async def executemany(self, query, rows):
+        await asyncio.to_thread(self._cursor.executemany, query, rows)
+
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def fetchmany(self, size=1):
+        return await asyncio.to_thread(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await asyncio.to_thread(self._cursor.fetchall)
+
+
+class AsyncConnection:
+    """Stand-in for an aiomysql connection opened with autocommit=True."""
+
+    def __init__(self, path: str):
+        self._connection = _connect(path, autocommit=True)
+
+    def cursor(self, *cursor_class):
+        return AsyncCursor(self._connection)
+
+    async def begin(self):
+        self._connection.execute("BEGIN")
+
+    async def commit(self):
+        self._connection.execute("COMMIT")
+
+    async def rollback(self):
+        if self._connection.in_transaction:
+            self._connection.execute("ROLLBACK")
+
+
+class _Acquire:
+    def __init__(self, pool):
+        self._pool = pool
+
+    async def __aenter__(self):
+        self._connection = await self._pool._free.get()
+        return self._connection
+
+    async def __aexit__(self, *exc_info):
+        self._pool._free.put_nowait(self._connection)
+
+
+class AsyncPool:
+    """Fixed-size pool mirroring aiomysql's default maxsize of 10."""
+
+    def __init__(self, path: str, maxsize: int = 10):
+        self._free = asyncio.Queue()
+        for _ in range(maxsize):
+            self._free.put_nowait(AsyncConnection(path))
+
+    def acquire(self):
+        return _Acquire(self)
+
+    def close(self):
+        while not self._free.empty():
+            self._free.get_nowait()._connection.close()
+
+    async def wait_closed(self):
+        pass
+
+
+def install(path: str):
+    """Route both MySQL drivers to the SQLite database at ``path``."""
+
+    def connect(**kwargs):
+        return Connection(path)
+
+    async def create_pool(maxsize: int = 10, **kwargs):
+        return AsyncPool(path, maxsize=maxsize)
+
+    mysql.connector.connect = connect
+    aiomysql.create_pool = create_pool
@@ -0,0 +1,327 @@
+"""Self-contained load benchmark for the sync and async stacks.
+
+Each configuration (router x middleware set) runs in its own uvicorn
+subprocess. By default the app talks to an embedded SQLite stand-in (see
+bench_backend.py); pass ``--backend mysql`` to use the MySQL server from the
+environment instead. The scenarios are:
+
+- crud: the k6_load_test.js mix (add, get, update, delete one book)
+- read: GET /books/{id} over a seeded catalogue
+- list: GET /books/ pages over a seeded catalogue
+
+Throughput, p50/p95/p99 latency and the server's peak RSS go to a JSON file.
+With ``--baseline`` the run is compared against a stored result and the
+process exits with status 1 if throughput drops or p95 latency grows by more
+than ``--tolerance``.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --routers sync --scenarios read --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+MIDDLEWARE = {
+    "none": [],
+    "security": ["security"],
+    "profiler": ["profiler"],
+    "all": ["security", "profiler"],
+}
+SCENARIOS = ("crud", "read", "list")
+SEED_BATCH = 500
+
+
+def build_app(router_name: str, middleware: list):
+    """Assemble the app the way app.py does, with the chosen router and middleware."""
+    from fastapi import FastAPI
+    from memory_profiling import PyInstrumentMiddleware
+    from security_headers import SecurityHeadersMiddleware
+
+    app = FastAPI()
+    if "security" in middleware:
+        app.add_middleware(SecurityHeadersMiddleware)
+    if "profiler" in middleware:
+        app.add_middleware(PyInstrumentMiddleware)
+
+    if router_name == "async":
+        from routing_async import router
+        from async_service import db_manager
+        app.include_router(router)
+        # Runs after the router's startup hook has opened the pool
+        app.router.add_event_handler("startup", db_manager.create_table)
+    else:
+        from routing import router
+        from service import db_manager
+        app.include_router(router)
+        db_manager.create_table()
+    return app
+
+
+def serve(args):
+    import uvicorn
+
+    if args.backend == "sqlite":
+        import bench_backend
+        bench_backend.install(args.database)
+    middleware = [name for name in args.middleware.split(",") if name]
+    uvicorn.run(build_app(args.router, middleware), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _peak_rss_mb(pid: int):
+    # VmHWM is the resident set high-water mark; only available on Linux
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _book(book_id: int, prefix: str = "Bench"):
+    return {
+        "title": f"{prefix} Book {book_id}",
+        "author": f"{prefix} Author {book_id % 100}",
+        "published_date": "2024-01-01",
+        "genre": "Fiction",
+    }
+
+
+async def _seed(client, count: int):
+    for start in range(1, count + 1, SEED_BATCH):
+        batch = [{"id": book_id, **_book(book_id)} for book_id in range(start, min(start + SEED_BATCH, count + 1))]
+        response = await client.post("/books/batch?upsert=true", json=batch)
+        response.raise_for_status()
+
+
+async def _crud(client, worker: int, iteration: int, seeded: int):
+    # Ids above the seeded range, unique per worker, as k6 used one id per VU
+    book_id = seeded + 1 + worker * 1_000_000 + iteration
+    yield await client.post(f"/books/?book_id={book_id}", json=_book(book_id, "Load Test"))
+    yield await client.get(f"/books/{book_id}")
+    yield await client.put(f"/books/{book_id}", json=_book(book_id, "Updated Load Test"))
+    yield await client.delete(f"/books/{book_id}")
+
+
+async def _read(client, worker: int, iteration: int, seeded: int):
+    yield await client.get(f"/books/{random.randint(1, seeded)}")
+
+
+async def _list(client, worker: int, iteration: int, seeded: int):
+    yield await client.get(f"/books/?limit=100&after={random.randint(0, max(0, seeded - 100))}")
+
+
+SCENARIO_STEPS = {"crud": _crud, "read": _read, "list": _list}
+
+
+async def _drive(base_url: str, scenario: str, duration: float, concurrency: int, seeded: int):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(index: int):
+            nonlocal errors
+            iteration = 0
+            while time.perf_counter() < deadline:
+                steps = SCENARIO_STEPS[scenario](client, index, iteration, seeded)
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        response = await steps.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    except httpx.HTTPError:
+                        errors += 1
+                        break
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code >= 400:
+                        errors += 1
+                iteration += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+    }
+
+
+async def _wait_ready(base_url: str, process, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Benchmark server exited with status {process.returncode}.")
+            try:
+                if (await client.get("/books/?limit=1")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Benchmark server did not become ready in time.")
+
+
+def run_configuration(args, router_name: str, middleware_name: str, workdir: str):
+    port = _free_port()
+    env = dict(os.environ)
+    # Keep log files and profiler reports out of the working tree
+    env.setdefault("LogFile", os.path.join(workdir, "bench_app.log"))
+    env.setdefault("ProfileDir", workdir)
+    env.update(dict(item.split("=", 1) for item in args.set))
+    database = os.path.join(workdir, f"{router_name}-{middleware_name}.sqlite3")
+    command = [
+        sys.executable, os.path.abspath(__file__), "serve",
+        "--router", router_name, "--middleware", ",".join(MIDDLEWARE[middleware_name]),
+        "--backend", args.backend, "--database", database, "--port", str(port),
+    ]
+    server_log = open(os.path.join(workdir, f"{router_name}-{middleware_name}.server.log"), "w")
+    process = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=server_log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    results = []
+    try:
+        try:
+            asyncio.run(_wait_ready(base_url, process))
+        except RuntimeError:
+            with open(server_log.name) as f:
+                sys.stderr.write(f.read()[-4000:])
+            raise
+
+        async def seed():
+            async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+                await _seed(client, args.books)
+
+        asyncio.run(seed())
+        for scenario in args.scenarios:
+            result = asyncio.run(_drive(base_url, scenario, args.duration, args.concurrency, args.books))
+            result.update(router=router_name, middleware=middleware_name, scenario=scenario)
+            results.append(result)
+            print(f"{router_name:5} {middleware_name:8} {scenario:5} {result['throughput_rps']:>9} req/s "
+                  f"p50 {result['p50_ms']} ms p95 {result['p95_ms']} ms p99 {result['p99_ms']} ms errors {result['errors']}")
+        peak_rss = _peak_rss_mb(process.pid)
+        for result in results:
+            result["peak_rss_mb"] = round(peak_rss, 1) if peak_rss is not None else None
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        server_log.close()
+    return results
+
+
+def compare(results, baseline, tolerance: float):
+    """Return a message for every result that regressed against the baseline."""
+    previous = {(r["router"], r["middleware"], r["scenario"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        key = (result["router"], result["middleware"], result["scenario"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        name = "/".join(key)
+        if before["throughput_rps"] and result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput_rps']} < baseline {before['throughput_rps']} req/s")
+        if before["p95_ms"] and result["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']} > baseline {before['p95_ms']} ms")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors, baseline had {before['errors']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command")
+
+    server = subparsers.add_parser("serve", help="run one app configuration (used internally)")
+    server.add_argument("--router", choices=("sync", "async"), required=True)
+    server.add_argument("--middleware", default="")
+    server.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    server.add_argument("--database", default=":memory:")
+    server.add_argument("--port", type=int, required=True)
+
+    parser.add_argument("--routers", nargs="+", choices=("sync", "async"), default=["sync", "async"])
+    parser.add_argument("--middleware", nargs="+", choices=sorted(MIDDLEWARE), default=["none", "security", "profiler", "all"])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent clients, like k6 VUs")
+    parser.add_argument("--books", type=int, default=2000, help="books seeded before the read and list scenarios")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for request ids")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="extra environment for the server")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args)
+        return 0
+
+    random.seed(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="library-bench-") as workdir:
+        for router_name in args.routers:
+            for middleware_name in args.middleware:
+                results.extend(run_configuration(args, router_name, middleware_name, workdir))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "backend": args.backend,
+            "duration_seconds": args.duration,
+            "concurrency": args.concurrency,
+            "books": args.books,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
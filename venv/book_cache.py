@@ -0,0 +1,178 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+
+
+class _Flight:
+    """One in-progress load that concurrent misses for the same key wait on."""
+
+    def __init__(self, writes, task=None):
+        self.writes = writes
+        self.task = task
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class BookCache:
+    """Bounded LRU cache with TTL for single-book reads.
+
+    404s are cached as negative entries for ``negative_ttl`` seconds.
+    Concurrent misses for the same key share a single load, and a load that
+    overlaps an invalidation is returned to its callers but not stored.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0, negative_ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value, error)
+        self._flights = {}
+        self._writes = 0
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        if entry[2] is not None:
+            self._negative_hits += 1
+        else:
+            self._hits += 1
+        return entry
+
+    def _store(self, key, value, error, writes):
+        # Caller holds the lock
+        if writes != self._writes:
+            return
+        ttl = self.negative_ttl if error is not None else self.ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value, error)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    @staticmethod
+    def _unwrap(value, error):
+        if error is not None:
+            raise HTTPException(status_code=error.status_code, detail=error.detail)
+        return value
+
+    def _begin(self, key, start_load):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry, None, False
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._coalesced += 1
+                return None, flight, False
+            self._misses += 1
+            flight = self._flights[key] = _Flight(self._writes, start_load())
+            return None, flight, True
+
+    def _finish(self, key, flight, value, error):
+        with self._lock:
+            if error is None or (isinstance(error, HTTPException) and error.status_code == 404):
+                self._store(key, value, error, flight.writes)
+            del self._flights[key]
+        flight.value, flight.error = value, error
+        flight.event.set()
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader()`` once on a miss."""
+        entry, flight, leader = self._begin(key, lambda: None)
+        if entry is not None:
+            return self._unwrap(entry[1], entry[2])
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            value = loader()
+        except BaseException as e:
+            self._finish(key, flight, None, e)
+            raise
+        self._finish(key, flight, value, None)
+        return value
+
+    async def aget_or_load(self, key, loader):
+        """Async variant of get_or_load; ``loader`` is a coroutine function.
+
+        The load runs as its own task, so a cancelled caller does not cancel
+        it for the other callers waiting on the same key.
+        """
+        entry, flight, leader = self._begin(key, lambda: asyncio.ensure_future(loader()))
+        if entry is not None:
+            return self._unwrap(entry[1], entry[2])
+        if leader:
+            flight.task.add_done_callback(lambda task: self._finish_task(key, flight, task))
+        return await asyncio.shield(flight.task)
+
+    def _finish_task(self, key, flight, task):
+        if task.cancelled():
+            with self._lock:
+                del self._flights[key]
+            return
+        error = task.exception()
+        self._finish(key, flight, None if error else task.result(), error)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._writes += 1
+            self._invalidations += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._negative_hits + self._misses + self._coalesced
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "hit_ratio": (self._hits + self._negative_hits + self._coalesced) / lookups if lookups else 0.0,
+            }
+
+
+def cache_from_env():
+    """Build the book cache from BookCache* settings; off unless BookCacheSize is set.
+
+    Each worker caches on its own and never sees writes made by other workers or
+    outside the app, so only turn it on where rows may be up to BookCacheTTL
+    seconds stale.
+    """
+    max_size = int(os.getenv('BookCacheSize', '0'))
+    if max_size <= 0:
+        return None
+    return BookCache(
+        max_size=max_size,
+        ttl=float(os.getenv('BookCacheTTL', '5')),
+        negative_ttl=float(os.getenv('BookCacheNegativeTTL', '5')),
+    )
@@ -0,0 +1,147 @@
+import base64
+import json
+from datetime import date
+from typing import Literal, Optional
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+# Secondary indexes backing the list filters; create_table adds any that are missing
+BOOK_INDEXES = {
+    "idx_books_author": "CREATE INDEX idx_books_author ON books (author)",
+    "idx_books_genre": "CREATE INDEX idx_books_genre ON books (genre)",
+    "idx_books_title": "CREATE INDEX idx_books_title ON books (title)",
+    "idx_books_published_date": "CREATE INDEX idx_books_published_date ON books (published_date)",
+    "ft_books_title_author": "CREATE FULLTEXT INDEX ft_books_title_author ON books (title, author)",
+}
+EXISTING_INDEXES_QUERY = """
+SELECT DISTINCT index_name FROM information_schema.statistics
+WHERE table_schema = DATABASE() AND table_name = 'books'
+"""
+
+
+class BookFilter(BaseModel):
+    author: Optional[str] = None
+    genre: Optional[str] = None
+    title_prefix: Optional[str] = None
+    q: Optional[str] = None
+    published_from: Optional[date] = None
+    published_to: Optional[date] = None
+    sort: Literal["id", "title", "author", "published_date"] = "id"
+    order: Literal["asc", "desc"] = "asc"
+
+
+def book_filters(
+    author: Optional[str] = None,
+    genre: Optional[str] = None,
+    title_prefix: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Full-text search over title and author"),
+    published_from: Optional[date] = None,
+    published_to: Optional[date] = None,
+    sort: Literal["id", "title", "author", "published_date"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+):
+    """FastAPI dependency reading the list filters from the query string."""
+    return BookFilter(
+        author=author, genre=genre, title_prefix=title_prefix, q=q,
+        published_from=published_from, published_to=published_to, sort=sort, order=order,
+    )
+
+
+def encode_cursor(book, sort: str):
+    """Opaque keyset cursor holding the sort value and ID of the last row."""
+    raw = json.dumps([book[sort], book["id"]], default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        value, book_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value, int(book_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def next_cursor(books, limit: int, filters: BookFilter):
+    """Value for X-Next-Cursor: the last ID for the default order, otherwise an opaque cursor."""
+    if len(books) < limit:
+        return None
+    if filters.sort == "id":
+        return str(books[-1]["id"])
+    return encode_cursor(books[-1], filters.sort)
+
+
+def _escape_like(value: str):
+    # "!" instead of backslash: the same ESCAPE clause then works on every backend
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def _keyset(sort: str, descending: bool, value, book_id: int):
+    # Rows strictly after (value, id) in the requested order; NULL dates sort
+    # first ascending and last descending, as MySQL orders them
+    compare = "<" if descending else ">"
+    if sort == "id":
+        return f"id {compare} %s", [book_id]
+    if value is None:
+        if descending:
+            return f"({sort} IS NULL AND id < %s)", [book_id]
+        return f"(({sort} IS NULL AND id > %s) OR {sort} IS NOT NULL)", [book_id]
+    clause = f"({sort} {compare} %s OR ({sort} = %s AND id {compare} %s)"
+    if descending and sort == "published_date":
+        clause += f" OR {sort} IS NULL"
+    return clause + ")", [value, value, book_id]
+
+
+def build_list_query(filters: Optional[BookFilter] = None, limit: Optional[int] = None,
+                     after: Optional[int] = None, cursor: Optional[str] = None):
+    """Build the filtered, sorted, keyset-paginated SELECT for the book list.
+
+    Returns the query and its parameters. ``after`` is an ID cursor for the
+    default ID order; ``cursor`` is an encode_cursor() token for any order.
+    """
+    filters = filters or BookFilter()
+    descending = filters.order == "desc"
+    conditions, params = [], []
+    if filters.author is not None:
+        conditions.append("author = %s")
+        params.append(filters.author)
+    if filters.genre is not None:
+        conditions.append("genre = %s")
+        params.append(filters.genre)
+    if filters.title_prefix:
+        conditions.append("title LIKE %s ESCAPE '!'")
+        params.append(_escape_like(filters.title_prefix) + "%")
+    if filters.q:
+        conditions.append("MATCH(title, author) AGAINST (%s IN NATURAL LANGUAGE MODE)")
+        params.append(filters.q)
+    if filters.published_from is not None:
+        conditions.append("published_date >= %s")
+        params.append(filters.published_from.isoformat())
+    if filters.published_to is not None:
+        conditions.append("published_date <= %s")
+        params.append(filters.published_to.isoformat())
+
+    if cursor is not None:
+        value, book_id = decode_cursor(cursor)
+    elif after is not None:
+        if filters.sort != "id":
+            raise HTTPException(status_code=400, detail="Use cursor to page through books sorted by anything but id.")
+        value, book_id = after, after
+    else:
+        book_id = None
+    if book_id is not None:
+        clause, clause_params = _keyset(filters.sort, descending, value, book_id)
+        conditions.append(clause)
+        params.extend(clause_params)
+
+    query = "SELECT * FROM books"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    direction = "DESC" if descending else "ASC"
+    if filters.sort == "id":
+        query += f" ORDER BY id {direction}"
+    else:
+        query += f" ORDER BY {filters.sort} {direction}, id {direction}"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+from mysql.connector import Error, InterfaceError, OperationalError
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of mysql.connector connections.
+
+    Connections are opened lazily up to ``size``. A checkout waits at most
+    ``timeout`` seconds for a free slot. Connections idle for longer than
+    ``ping_interval`` seconds are pinged (and reconnected) before reuse. Any
+    transaction still open on release is rolled back. A connection that lost
+    its session (OperationalError, InterfaceError or no longer connected) is
+    dropped together with the idle ones, which most likely died with it.
+    """
+
+    def __init__(self, connect, size: int = 10, timeout: float = 5.0, ping_interval: float = 30.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, released_at), most recently used last
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._created >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s.")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                else:
+                    connection, released_at = None, None
+                    self._created += 1
+                self._in_use += 1
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - start
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        # Connecting and pinging happen outside the lock
+        try:
+            if connection is None:
+                connection = self._connect()
+            elif time.monotonic() - released_at > self.ping_interval:
+                connection.ping(reconnect=True, attempts=1, delay=0)
+        except Exception:
+            self._forget(connection)
+            raise
+        return connection
+
+    def release(self, connection, discard: bool = False):
+        if not discard:
+            try:
+                # autocommit is off, so even a lone SELECT leaves a transaction, and its
+                # REPEATABLE READ snapshot, open; end it so the next caller sees fresh rows
+                if connection.in_transaction:
+                    connection.rollback()
+            except Error:
+                discard = True
+        if discard:
+            self._forget(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _forget(self, connection):
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self._cond:
+            self._created -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        except Error as e:
+            reusable = self._reusable(connection, e)
+            self.release(connection, discard=not reusable)
+            if not reusable:
+                # A server restart kills every pooled session: drop the idle ones as well,
+                # so a retry gets a fresh connection instead of the next dead one
+                self.close()
+            raise
+        except BaseException:
+            self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    @staticmethod
+    def _reusable(connection, error):
+        if isinstance(error, (OperationalError, InterfaceError)):
+            return False
+        try:
+            return connection.is_connected()
+        except Error:
+            return False
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "total_wait_seconds": self._total_wait,
+                "avg_wait_seconds": self._total_wait / self._checkouts if self._checkouts else 0.0,
+                "max_wait_seconds": self._max_wait,
+            }
@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site for records at INFO and below.
+
+    Each logging call site (file and line) may emit ``rate`` records per
+    second with bursts up to ``burst``; the rest are dropped and counted, and
+    the next record let through reports how many were suppressed. Warnings
+    and errors are never limited.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # (pathname, lineno) -> [tokens, last_refill, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or self.rate <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging():
+    """Configure the "LibraryManager" logger once and return it.
+
+    Records are put on a queue by the calling thread and written to the
+    console and a size-rotated log file by a background listener thread, so
+    request handlers never block on log I/O. Repeated calls return the same
+    logger without adding handlers.
+    """
+    global _listener
+    logger = logging.getLogger("LibraryManager")
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+        logger.setLevel(logging.DEBUG)  # Set desired log level
+
+        # Create size-rotated file handler
+        file_handler = RotatingFileHandler(
+            os.getenv('LogFile', 'custom_app.log'),
+            maxBytes=int(os.getenv('LogMaxBytes', str(10 * 1024 * 1024))),
+            backupCount=int(os.getenv('LogBackupCount', '5')),
+        )
+        file_handler.setLevel(logging.DEBUG)
+
+        # Create console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+
+        # Create formatter, plain text or one JSON object per line
+        if os.getenv('LogFormat', 'text') == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        console_handler.setFormatter(formatter)
+
+        # Hand records to the listener thread; hot-path INFO lines are rate limited first
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(
+            rate=float(os.getenv('LogRateLimit', '10')),
+            burst=int(os.getenv('LogRateBurst', '20')),
+        ))
+        logger.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+    return logger
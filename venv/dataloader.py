@@ -0,0 +1,54 @@
+import asyncio
+
+
+class DataLoader:
+    """Coalesce single-key loads issued in the same event-loop tick.
+
+    ``batch_load`` is a coroutine function taking a list of keys and returning
+    a dict of the keys that were found. Every ``load(key)`` made before the
+    loop gets back to its scheduled callbacks joins one batch; keys missing
+    from the result raise KeyError for their callers.
+    """
+
+    def __init__(self, batch_load, max_batch_size: int = 500):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._pending = {}
+        self._scheduled = False
+        self._tasks = set()
+
+    def load(self, key):
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self):
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch_size]}
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            found = await self.batch_load(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if future.done():
+                continue
+            if key in found:
+                future.set_result(found[key])
+            else:
+                future.set_exception(KeyError(key))
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+def settings_from_env():
+    """Group-commit settings, or None unless WriteBehind=1 opts in."""
+    if os.getenv('WriteBehind', '0') not in ('1', 'true'):
+        return None
+    return {
+        "max_batch": int(os.getenv('GroupCommitMaxBatch', '100')),
+        "max_delay": float(os.getenv('GroupCommitMaxDelayMs', '5')) / 1000,
+        "max_queue": int(os.getenv('GroupCommitMaxQueue', '1000')),
+    }
+
+
+class AsyncGroupCommitter:
+    """Queue writes and flush them in one transaction per batch.
+
+    ``run_batch`` is a coroutine function taking a list of operations and
+    returning one ``(value, error)`` pair per operation. A batch is flushed
+    when ``max_batch`` operations are queued or ``max_delay`` seconds after
+    its first one arrived, whichever comes first. At most ``max_queue``
+    operations wait at once; further submits wait for room.
+    """
+
+    def __init__(self, run_batch, max_batch: int = 100, max_delay: float = 0.005, max_queue: int = 1000):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        # Set by submit() once a full batch is waiting, to cut the delay short
+        self._full = asyncio.Event()
+        self._task = None
+        self._flushing = None
+
+    async def submit(self, operation):
+        """Queue one operation and return its result once its batch has committed."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._flush_forever())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        if self._queue.qsize() >= self.max_batch - 1:
+            self._full.set()
+        value, error = await asyncio.shield(future)
+        if error is not None:
+            raise error
+        return value
+
+    async def _flush_forever(self):
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                self._full.clear()
+                if self._queue.qsize() < self.max_batch - 1:
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.max_delay)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                # Even when close() cancels us mid-wait, the collected batch still gets flushed
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+
+    async def _flush(self, batch):
+        try:
+            results = await self.run_batch([operation for operation, _ in batch])
+        except Exception as e:
+            results = [(None, e)] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Flush whatever is still queued and stop the flusher."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None:
+            await self._flushing
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        for start in range(0, len(batch), self.max_batch):
+            await self._flush(batch[start:start + self.max_batch])
+
+
+class GroupCommitter:
+    """Thread-based AsyncGroupCommitter for the synchronous DatabaseManager.
+
+    ``run_batch`` is a plain function. Callers block in submit() until their
+    batch has been committed by the background flusher thread.
+    """
+
+    def __init__(self, run_batch, max_batch: int = 100, max_delay: float = 0.005, max_queue: int = 1000):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._flush_forever, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation):
+        """Queue one operation and return its result once its batch has committed."""
+        future = Future()
+        self._queue.put((operation, future))
+        value, error = future.result()
+        if error is not None:
+            raise error
+        return value
+
+    def _flush_forever(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                results = self.run_batch([operation for operation, _ in batch])
+            except Exception as e:
+                results = [(None, e)] * len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def dump_json(content) -> bytes:
+    """Serialize rows straight to JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, default=str)
+    return json.dumps(content, default=str, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that skips jsonable_encoder when returned from a route."""
+
+    def render(self, content) -> bytes:
+        return dump_json(content)
+
+
+class TableVersion:
+    """Counter bumped on every write to the books table.
+
+    It only tells a cached response that this process wrote since it was
+    stored; ETags and Last-Modified come from the response body itself
+    (see ResponseCache), so they agree across workers and restarts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+
+
+def is_not_modified(request: Request, headers) -> bool:
+    """True when the client's If-None-Match or If-Modified-Since still matches."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers["ETag"]
+        return any(tag.strip() in (etag, etag[2:], "*") for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+
+def not_modified(headers):
+    return Response(status_code=304, headers=headers)
+
+
+class ResponseCache:
+    """Small LRU of serialized response bodies and their validators.
+
+    An entry is served while the table version it was stored under is still
+    current and it is younger than ``max_age`` seconds (HttpCacheMaxAge,
+    default 5), so writes made by other workers show up too. Past that the
+    caller goes back to the database and stores the fresh body with ``put``:
+    the ETag is a hash of the body, so an unchanged result keeps its ETag
+    and its Last-Modified, and still answers 304, whatever the version did.
+    """
+
+    def __init__(self, max_size: int = 128, max_age: float = None):
+        self.max_size = max_size
+        self.max_age = max_age if max_age is not None else float(os.getenv('HttpCacheMaxAge', '5'))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (version, body, headers, last_modified, stored_at)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_version, body, headers, _, stored_at = entry
+            # A stale entry stays until put replaces it: its validators are still needed
+            if stored_version != version or (self.max_age and time.monotonic() - stored_at >= self.max_age):
+                return None
+            self._entries.move_to_end(key)
+            return body, headers
+
+    def put(self, key, version, body: bytes, headers=None):
+        """Store ``body`` under ``version`` and return it with its ETag and Last-Modified headers."""
+        etag = f'W/"{hashlib.blake2s(body, digest_size=12).hexdigest()}"'
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous[2]["ETag"] == etag:
+                last_modified = previous[3]
+            else:
+                # HTTP dates have one-second precision: give every new body its own second,
+                # or a change in the same second as the last one would still answer 304
+                last_modified = time.time()
+                if previous is not None:
+                    last_modified = max(last_modified, math.floor(previous[3]) + 1)
+            headers = {
+                **(headers or {}),
+                "ETag": etag,
+                "Last-Modified": formatdate(last_modified, usegmt=True),
+                "Cache-Control": "no-cache",
+            }
+            self._entries[key] = (version, body, headers, last_modified, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return body, headers
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, JSONRenderer, SpeedscopeRenderer
+from pyinstrument.session import Session
+
+RENDERERS = {
+    "speedscope": (SpeedscopeRenderer, "speedscope.json"),
+    "json": (JSONRenderer, "json"),
+    "html": (HTMLRenderer, "html"),
+}
+# Requests that match no route share one report, whatever path they asked for
+UNMATCHED_TEMPLATE = "unmatched"
+
+
+class PyInstrumentMiddleware:
+    """Pure ASGI middleware that profiles a sample of requests with pyinstrument.
+
+    A request is profiled when it wins the ``sample_rate`` draw or asks for it
+    with an ``X-Profile: 1`` header or ``?profile=1`` query flag. Samples are
+    merged per route template (``/books/{book_id}``) over a window of
+    ``window_samples`` samples or ``window_seconds`` seconds. When a window
+    closes, its report is written to a file named after the template and the
+    window's start time, and the merged session is dropped, so memory and
+    render time stay bounded. Rendering and writing happen on a background
+    thread, never on the event loop. Requests that are not sampled go
+    straight through to the app.
+    """
+
+    def __init__(self, app, sample_rate: float = None, output_dir: str = None, renderer: str = None, interval: float = None,
+                 window_samples: int = None, window_seconds: float = None):
+        self.app = app
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv('ProfileSampleRate', '0.01'))
+        self.output_dir = output_dir or os.getenv('ProfileDir', '.')
+        self.renderer = renderer or os.getenv('ProfileFormat', 'speedscope')
+        if self.renderer not in RENDERERS:
+            raise ValueError(f"Unknown profile format {self.renderer!r}, expected one of {sorted(RENDERERS)}.")
+        self.interval = interval if interval is not None else float(os.getenv('ProfileInterval', '0.001'))
+        self.window_samples = window_samples if window_samples is not None else int(os.getenv('ProfileWindowSamples', '100'))
+        self.window_seconds = window_seconds if window_seconds is not None else float(os.getenv('ProfileWindowSeconds', '300'))
+        self._windows = {}  # template -> [merged session, samples, started at]
+        self._active = False
+        # One worker: merges and file writes for a route never race each other
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-writer")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # Only one profiler runs at a time; overlapping sampled requests pass through
+        self._active = True
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            self._active = False
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_TEMPLATE
+            asyncio.get_running_loop().run_in_executor(self._executor, self._record, template, profiler.last_session)
+
+    def _should_profile(self, scope):
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return True
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return value in (b"1", b"true")
+        query_string = scope.get("query_string", b"")
+        if b"profile=" in query_string:
+            return parse_qs(query_string.decode("latin-1")).get("profile", [""])[-1] in ("1", "true")
+        return False
+
+    def _record(self, template, session):
+        if session is None:
+            return
+        window = self._windows.get(template)
+        if window is None:
+            window = self._windows[template] = [session, 0, time.time()]
+        else:
+            window[0] = Session.combine(window[0], session)
+        window[1] += 1
+        if window[1] >= self.window_samples or time.time() - window[2] >= self.window_seconds:
+            self._write(template)
+
+    def _write(self, template):
+        merged, _, started = self._windows.pop(template)
+        renderer_class, extension = RENDERERS[self.renderer]
+        endpoint = template.replace('/', '_')
+        stamp = datetime.fromtimestamp(started).strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.output_dir, f"memory_profile_{endpoint}.{stamp}.{extension}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(renderer_class().render(merged))
+
+    def _write_all(self):
+        for template in list(self._windows):
+            self._write(template)
+
+    def flush(self):
+        """Write out every open window and block until all reports are on disk."""
+        self._executor.submit(self._write_all).result()
@@ -0,0 +1,115 @@
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from async_service import db_manager, Book, BookRecord, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_BATCH_SIZE, STREAM_CHUNK_SIZE
+from book_query import BookFilter, book_filters, next_cursor
+from http_cache import ResponseCache, dump_json, is_not_modified, not_modified
+
+router = APIRouter()
+
+# Serialized book and list responses, keyed by path and query string
+response_cache = ResponseCache()
+
+# Connect to the database when the app starts
+@router.on_event("startup")
+async def startup():
+    await db_manager.init()
+
+# Close db_manager pool on shutdown
+@router.on_event("shutdown")
+async def shutdown():
+    await db_manager.close()
+
+# Route to add a book
+@router.post("/books/")
+async def add_book(book_id: int, book: Book):
+    return await db_manager.add_book(book_id, book)
+
+def _check_batch_size(items):
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} books per batch.")
+
+# Batch routes are declared before /books/{book_id} so "batch" is not read as an ID
+# Route to add (or with upsert=true, add or update) many books
+@router.post("/books/batch")
+async def add_books(books: List[BookRecord], upsert: bool = False):
+    _check_batch_size(books)
+    return await db_manager.add_books(books, upsert=upsert)
+
+# Route to get many books by ID
+@router.get("/books/batch")
+async def get_books(ids: List[int] = Query(...)):
+    _check_batch_size(ids)
+    return await db_manager.get_books_by_ids(ids)
+
+# Route to delete many books by ID
+@router.delete("/books/batch")
+async def delete_books(ids: List[int] = Query(...)):
+    _check_batch_size(ids)
+    return await db_manager.delete_books_by_ids(ids)
+
+# Route to get a book by ID, answering 304 while the book is unchanged
+@router.get("/books/{book_id}")
+async def get_book(book_id: int, request: Request):
+    key = (request.url.path, request.url.query)
+    version = db_manager.table_version.value
+    cached = response_cache.get(key, version)
+    if cached is None:
+        cached = response_cache.put(key, version, dump_json(await db_manager.get_book_by_id(book_id)))
+    body, headers = cached
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+# Route to update a book by ID
+@router.put("/books/{book_id}")
+async def update_book(book_id: int, book: Book):
+    return await db_manager.update_book_by_id(book_id, book)
+
+# Route to delete a book by ID
+@router.delete("/books/{book_id}")
+async def delete_book(book_id: int):
+    return await db_manager.delete_book_by_id(book_id)
+
+async def _ndjson(books):
+    # Send a chunk of rows per body message rather than one message per row
+    lines = []
+    async for book in books:
+        lines.append(json.dumps(book, default=str) + "\n")
+        if len(lines) >= STREAM_CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+# Route to search and display books, one keyset page at a time or streamed as NDJSON.
+# X-Next-Cursor is the next "after" ID for the default order, otherwise a "cursor" token.
+# Pages answer 304 while their content is unchanged and are served from response_cache.
+@router.get("/books/")
+async def display_books(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    filters: BookFilter = Depends(book_filters),
+):
+    if stream:
+        return StreamingResponse(_ndjson(db_manager.stream_all_books(filters=filters)), media_type="application/x-ndjson")
+    key = (request.url.path, request.url.query)
+    version = db_manager.table_version.value
+    cached = response_cache.get(key, version)
+    if cached is None:
+        books = await db_manager.display_all_books(limit=limit, after=after, filters=filters, cursor=cursor)
+        cursor = next_cursor(books, limit, filters)
+        cached = response_cache.put(key, version, dump_json(books), {"X-Next-Cursor": cursor} if cursor is not None else None)
+    body, headers = cached
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+# Route to inspect book cache hit/miss counters
+@router.get("/cache/stats")
+async def cache_stats():
+    return db_manager.cache_stats()
@@ -0,0 +1,360 @@
+from fastapi import HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+import mysql.connector
+from mysql.connector import DataError, Error, IntegrityError, InterfaceError, OperationalError
+from dotenv import load_dotenv
+import functools
+import os
+from contextlib import contextmanager
+from connection_pool import ConnectionPool, PoolTimeout
+from book_cache import cache_from_env
+from http_cache import TableVersion
+from group_commit import GroupCommitter, settings_from_env
+from book_query import BookFilter, BOOK_INDEXES, EXISTING_INDEXES_QUERY, build_list_query
+from custom_logging import setup_logging
+
+# Setup logging
+logger = setup_logging()
+
+# Load environment variables
+load_dotenv()
+
+# Pagination and streaming limits for the book listing
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+# Largest number of books accepted by one batch call
+MAX_BATCH_SIZE = 500
+
+ADD_BOOK_QUERY = "INSERT INTO books (id, title, author, published_date, genre) VALUES (%s, %s, %s, %s, %s)"
+UPDATE_BOOK_QUERY = "UPDATE books SET title = %s, author = %s, published_date = %s, genre = %s WHERE id = %s"
+DELETE_BOOK_QUERY = "DELETE FROM books WHERE id = %s"
+
+def _book_to_dict(book):
+    return {"id": book[0], "title": book[1], "author": book[2], "published_date": book[3], "genre": book[4]}
+
+def _placeholders(count: int):
+    return ", ".join(["%s"] * count)
+
+def _result(book_id: int, status: int, message: str):
+    return {"id": book_id, "status": status, "message": message}
+
+def _retry_on_disconnect(method):
+    # A pooled connection can die while idle (say, a MySQL restart). The pool then drops
+    # it and its idle siblings, so running the operation once more uses a fresh connection.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except (OperationalError, InterfaceError) as e:
+            logger.warning(f"Lost database connection ({e}); retrying once.")
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class Book(BaseModel):
+    title: str
+    author: str
+    published_date: Optional[str] = None
+    genre: Optional[str] = None
+
+class BookRecord(Book):
+    id: int
+
+class DatabaseManager:
+    def __init__(self):
+        # Connections are opened on demand, so startup no longer needs MySQL to be up
+        self.pool = ConnectionPool(
+            self._connect,
+            size=int(os.getenv('PoolSize', '10')),
+            timeout=float(os.getenv('PoolTimeout', '5')),
+        )
+        # Optional read-through cache for get_book_by_id
+        self.cache = cache_from_env()
+        # Bumped on every write; read routes only reuse responses cached under the current value
+        self.table_version = TableVersion()
+        # Opt-in write-behind: single-book writes share one transaction per batch
+        settings = settings_from_env()
+        self.group_commit = GroupCommitter(self._write_batch, **settings) if settings else None
+
+    def _connect(self):
+        try:
+            connection = mysql.connector.connect(
+                host=os.getenv('Host'),  # Make sure this is 'localhost'
+                user=os.getenv('User'),
+                password=os.getenv('Password'),
+                database=os.getenv('Database')
+            )
+            if not connection.is_connected():
+                logger.error("Database connection failed.")
+                raise HTTPException(status_code=500, detail="Database connection failed.")
+            logger.info("Database connection established.")
+            return connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise HTTPException(status_code=500, detail=f"Database connection error: {e}")
+
+    def _acquire(self):
+        try:
+            return self.pool.acquire()
+        except PoolTimeout as e:
+            logger.error(f"Database pool exhausted: {e}")
+            raise HTTPException(status_code=503, detail="Database is busy, try again later.")
+
+    @contextmanager
+    def _connection(self):
+        # Check a connection out of the pool for the duration of one operation
+        try:
+            with self.pool.connection() as connection:
+                yield connection
+        except PoolTimeout as e:
+            logger.error(f"Database pool exhausted: {e}")
+            raise HTTPException(status_code=503, detail="Database is busy, try again later.")
+
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else {"enabled": False}
+
+    def _invalidate(self, book_id: int):
+        self.table_version.bump()
+        if self.cache:
+            self.cache.invalidate(book_id)
+
+    def create_table(self):
+        with self._connection() as connection:
+            with connection.cursor() as cursor:
+                query = """
+                CREATE TABLE IF NOT EXISTS books (
+                    id INT PRIMARY KEY,
+                    title VARCHAR(255) NOT NULL,
+                    author VARCHAR(255) NOT NULL,
+                    published_date DATE,
+                    genre VARCHAR(100)
+                );
+                """
+                cursor.execute(query)
+                # Add the secondary and FULLTEXT indexes missing from older tables
+                cursor.execute(EXISTING_INDEXES_QUERY)
+                existing = {row[0] for row in cursor.fetchall()}
+                for name, statement in BOOK_INDEXES.items():
+                    if name not in existing:
+                        cursor.execute(statement)
+                        logger.info(f"Created index {name} on books.")
+                connection.commit()
+                logger.info("Books table created or already exists.")
+
+    def add_book(self, book_id: int, book: Book):
+        return self._write(("add", book_id, book))
+
+    def get_book_by_id(self, book_id: int):
+        if self.cache is None:
+            return self._fetch_book(book_id)
+        return self.cache.get_or_load(book_id, lambda: self._fetch_book(book_id))
+
+    @_retry_on_disconnect
+    def _fetch_book(self, book_id: int):
+        with self._connection() as connection:
+            with connection.cursor() as cursor:
+                query = "SELECT * FROM books WHERE id = %s"
+                cursor.execute(query, (book_id,))
+                book = cursor.fetchone()
+                if book:
+                    logger.info(f"Book retrieved: {book[1]} (ID: {book_id})")
+                    return _book_to_dict(book)
+                else:
+                    logger.warning(f"Book not found (ID: {book_id}).")
+                    raise HTTPException(status_code=404, detail="Book not found.")
+
+    def update_book_by_id(self, book_id: int, book: Book):
+        return self._write(("update", book_id, book))
+
+    def delete_book_by_id(self, book_id: int):
+        return self._write(("delete", book_id, None))
+
+    @_retry_on_disconnect
+    def _write(self, operation):
+        # With WriteBehind on, the write waits for the next group commit instead
+        if self.group_commit is not None:
+            return self.group_commit.submit(operation)
+        with self._connection() as connection:
+            with connection.cursor() as cursor:
+                value, error = self._apply_write(cursor, operation)
+                connection.commit()
+        if error is not None:
+            raise error
+        self._invalidate(operation[1])
+        return value
+
+    def _apply_write(self, cursor, operation):
+        # Returns (value, error) so a missing row fails only its own caller in a group commit
+        kind, book_id, book = operation
+        if kind == "add":
+            cursor.execute(ADD_BOOK_QUERY, (book_id, book.title, book.author, book.published_date, book.genre))
+            logger.info(f"Book added: {book.title} (ID: {book_id})")
+            return {"message": "Book added successfully."}, None
+        if kind == "update":
+            cursor.execute(UPDATE_BOOK_QUERY, (book.title, book.author, book.published_date, book.genre, book_id))
+            if cursor.rowcount == 0:
+                logger.warning(f"Book not found for update (ID: {book_id}).")
+                return None, HTTPException(status_code=404, detail="Book not found.")
+            logger.info(f"Book updated: {book.title} (ID: {book_id})")
+            return {"message": "Book updated successfully."}, None
+        cursor.execute(DELETE_BOOK_QUERY, (book_id,))
+        if cursor.rowcount == 0:
+            logger.warning(f"Book not found for deletion (ID: {book_id}).")
+            return None, HTTPException(status_code=404, detail="Book not found.")
+        logger.info(f"Book deleted (ID: {book_id})")
+        return {"message": "Book deleted successfully."}, None
+
+    def _write_batch(self, operations):
+        # All queued writes in one transaction, one (value, error) pair per write
+        try:
+            with self._connection() as connection:
+                with connection.cursor() as cursor:
+                    try:
+                        results = [self._apply_write(cursor, operation) for operation in operations]
+                        connection.commit()
+                    except Error:
+                        connection.rollback()
+                        raise
+        except (IntegrityError, DataError) as e:
+            if len(operations) == 1:
+                return [(None, e)]
+            # One bad write (say a duplicate ID) must not fail the rest: redo each on its own.
+            # Anything else, like a lost connection, propagates and fails the batch once.
+            logger.warning(f"Group commit of {len(operations)} writes failed ({e}); retrying one at a time.")
+            return [self._write_batch([operation])[0] for operation in operations]
+        # A missing row changed nothing, so it must not move the version or the cache
+        for operation, (_, error) in zip(operations, results):
+            if error is None:
+                self._invalidate(operation[1])
+        logger.info(f"Group commit wrote {len(operations)} books.")
+        return results
+
+    @_retry_on_disconnect
+    def get_books_by_ids(self, book_ids: List[int]):
+        # One IN query for the whole batch, one result per requested ID
+        found = {}
+        ids = list(set(book_ids))
+        if ids:
+            with self._connection() as connection:
+                with connection.cursor() as cursor:
+                    query = f"SELECT * FROM books WHERE id IN ({_placeholders(len(ids))})"
+                    cursor.execute(query, ids)
+                    found = {book[0]: _book_to_dict(book) for book in cursor.fetchall()}
+        logger.info(f"Retrieved {len(found)} of {len(book_ids)} requested books.")
+        return [
+            {"id": book_id, "status": 200, "book": found[book_id]} if book_id in found
+            else _result(book_id, 404, "Book not found.")
+            for book_id in book_ids
+        ]
+
+    @_retry_on_disconnect
+    def add_books(self, books: List[BookRecord], upsert: bool = False):
+        # Insert (or upsert) the whole batch with executemany in one transaction
+        results, rows, seen = [], [], set()
+        with self._connection() as connection:
+            with connection.cursor() as cursor:
+                try:
+                    ids = list({book.id for book in books})
+                    existing = set()
+                    if ids:
+                        # Lock the rows, and the gaps of missing IDs, until commit so a concurrent
+                        # insert can't turn a 201 below into a duplicate-key failure
+                        cursor.execute(f"SELECT id FROM books WHERE id IN ({_placeholders(len(ids))}) FOR UPDATE", ids)
+                        existing = {row[0] for row in cursor.fetchall()}
+                    for book in books:
+                        if book.id in seen:
+                            results.append(_result(book.id, 400, "Duplicate book ID in batch."))
+                        elif book.id in existing and not upsert:
+                            results.append(_result(book.id, 409, "Book already exists."))
+                        elif book.id in existing:
+                            results.append(_result(book.id, 200, "Book updated successfully."))
+                        else:
+                            results.append(_result(book.id, 201, "Book added successfully."))
+                        if results[-1]["status"] < 400:
+                            rows.append((book.id, book.title, book.author, book.published_date, book.genre))
+                        seen.add(book.id)
+                    if rows:
+                        query = ADD_BOOK_QUERY
+                        if upsert:
+                            query += """
+                            ON DUPLICATE KEY UPDATE title = VALUES(title), author = VALUES(author),
+                            published_date = VALUES(published_date), genre = VALUES(genre)
+                            """
+                        cursor.executemany(query, rows)
+                    connection.commit()
+                except Error:
+                    connection.rollback()
+                    raise
+                for row in rows:
+                    self._invalidate(row[0])
+                logger.info(f"Batch wrote {len(rows)} of {len(books)} books.")
+                return results
+
+    @_retry_on_disconnect
+    def delete_books_by_ids(self, book_ids: List[int]):
+        # Lock the existing rows, delete them together and report per ID
+        existing = set()
+        ids = list(set(book_ids))
+        if ids:
+            with self._connection() as connection:
+                with connection.cursor() as cursor:
+                    try:
+                        cursor.execute(f"SELECT id FROM books WHERE id IN ({_placeholders(len(ids))}) FOR UPDATE", ids)
+                        existing = {row[0] for row in cursor.fetchall()}
+                        if existing:
+                            cursor.execute(f"DELETE FROM books WHERE id IN ({_placeholders(len(existing))})", list(existing))
+                        connection.commit()
+                    except Error:
+                        connection.rollback()
+                        raise
+            for book_id in existing:
+                self._invalidate(book_id)
+        logger.info(f"Batch deleted {len(existing)} of {len(book_ids)} books.")
+        return [
+            _result(book_id, 200, "Book deleted successfully.") if book_id in existing
+            else _result(book_id, 404, "Book not found.")
+            for book_id in book_ids
+        ]
+
+    @_retry_on_disconnect
+    def display_all_books(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                          filters: Optional[BookFilter] = None, cursor: Optional[str] = None):
+        # Filtered, sorted keyset page: only one indexed page is ever read
+        query, params = build_list_query(filters, limit=limit, after=after, cursor=cursor)
+        with self._connection() as connection:
+            with connection.cursor() as db_cursor:
+                db_cursor.execute(query, params)
+                books = db_cursor.fetchall()
+                logger.info("Retrieved all books.")
+                return [_book_to_dict(book) for book in books]
+
+    def stream_all_books(self, chunk_size: int = STREAM_CHUNK_SIZE, filters: Optional[BookFilter] = None):
+        # Unbuffered cursor: rows are pulled from the server chunk by chunk
+        query, params = build_list_query(filters)
+        connection = self._acquire()
+        finished = False
+        try:
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(query, params)
+            while True:
+                books = cursor.fetchmany(chunk_size)
+                if not books:
+                    break
+                for book in books:
+                    yield _book_to_dict(book)
+            cursor.close()
+            finished = True
+            logger.info("Streamed all books.")
+        finally:
+            # Closed early (the client hung up) with rows still unread: drop the connection
+            # rather than read the rest of the result just to hand it back to the pool
+            self.pool.release(connection, discard=not finished)
+
+# Initialize DatabaseManager
+db_manager = DatabaseManager() 
+ 
@@ -0,0 +1,533 @@
+import json
+import logging
+from datetime import date
+from email.utils import parsedate_to_datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+import mysql.connector
+from mysql.connector import Error
+from routing import router
+from app import app  
+from service import db_manager, Book, BookRecord, DatabaseManager, MAX_BATCH_SIZE
+from connection_pool import ConnectionPool, PoolTimeout
+from book_cache import BookCache
+from memory_profiling import PyInstrumentMiddleware
+from custom_logging import setup_logging, RateLimitFilter
+from benchmark import compare
+from book_query import BookFilter, build_list_query, next_cursor
+from http_cache import FastJSONResponse, ResponseCache
+import bench_backend
+
+# Initialize TestClient with the FastAPI app
+client = TestClient(app)
+@pytest.fixture
+def mock_db_manager():
+    # New mock data: move the table version so no earlier cached response is served
+    db_manager.table_version.bump()
+    db_manager.add_book = MagicMock(return_value={"message": "Book added successfully."})
+    db_manager.get_book_by_id = MagicMock(return_value={
+        "id": 1,
+        "title": "Test Book",
+        "author": "Test Author",
+        "published_date": "2023-01-01",
+        "genre": "Fiction"
+    })
+    db_manager.update_book_by_id = MagicMock(return_value={"message": "Book updated successfully."})
+    db_manager.delete_book_by_id = MagicMock(return_value={"message": "Book deleted successfully."})
+    db_manager.display_all_books = MagicMock(return_value=[
+        {"id": 1, "title": "Test Book", "author": "Test Author", "published_date": "2023-01-01", "genre": "Fiction"},
+        {"id": 2, "title": "Another Book", "author": "Another Author", "published_date": "2022-05-15", "genre": "Non-fiction"}
+    ])
+def test_add_book(mock_db_manager):
+    book_data = {
+        "title": "Test Book",
+        "author": "Test Author",
+        "published_date": "2023-01-01",
+        "genre": "Fiction"
+    }
+    response = client.post("/books/?book_id=1", json=book_data)
+    assert response.status_code == 200
+    assert response.json() == {"message": "Book added successfully."}
+
+def test_get_book_by_id(mock_db_manager):
+    response = client.get("/books/1")
+    assert response.status_code == 200
+    assert response.json() == {
+        "id": 1,
+        "title": "Test Book",
+        "author": "Test Author",
+        "published_date": "2023-01-01",
+        "genre": "Fiction"
+    }
+
+def test_update_book_by_id(mock_db_manager):
+    updated_data = {
+        "title": "Updated Book",
+        "author": "Updated Author",
+        "published_date": "2024-02-01",
+        "genre": "Drama"
+    }
+    response = client.put("/books/1", json=updated_data)
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Book updated successfully."}
+
+def test_delete_book_by_id(mock_db_manager):
+  
+    response = client.delete("/books/1")
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Book deleted successfully."}
+
+def test_display_all_books(mock_db_manager):
+    response = client.get("/books/")
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "title": "Test Book", "author": "Test Author", "published_date": "2023-01-01", "genre": "Fiction"},
+        {"id": 2, "title": "Another Book", "author": "Another Author", "published_date": "2022-05-15", "genre": "Non-fiction"}
+    ]
+
+def test_display_books_paginated(mock_db_manager):
+    db_manager.display_all_books = MagicMock(return_value=[
+        {"id": 3, "title": "Test Book", "author": "Test Author", "published_date": "2023-01-01", "genre": "Fiction"},
+        {"id": 7, "title": "Another Book", "author": "Another Author", "published_date": "2022-05-15", "genre": "Non-fiction"}
+    ])
+    response = client.get("/books/?limit=2&after=1")
+
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] == "7"
+    db_manager.display_all_books.assert_called_once_with(limit=2, after=1, filters=BookFilter(), cursor=None)
+
+def test_display_books_last_page_has_no_cursor(mock_db_manager):
+    response = client.get("/books/?limit=10")
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+def test_stream_books(mock_db_manager):
+    db_manager.stream_all_books = MagicMock(return_value=(book for book in [
+        {"id": 1, "title": "Test Book", "author": "Test Author", "published_date": "2023-01-01", "genre": "Fiction"},
+        {"id": 2, "title": "Another Book", "author": "Another Author", "published_date": "2022-05-15", "genre": "Non-fiction"}
+    ]))
+    response = client.get("/books/?stream=true")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line["id"] for line in map(json.loads, response.text.splitlines())] == [1, 2]
+
+def test_stream_closed_early_drops_its_connection(monkeypatch):
+    connection = MagicMock()
+    cursor = connection.cursor.return_value
+    cursor.fetchmany.return_value = [(1, "Test Book", "Test Author", None, None)]
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: connection)
+    manager = DatabaseManager()
+
+    books = manager.stream_all_books(chunk_size=1)
+    assert next(books)["id"] == 1
+    books.close()
+
+    cursor.close.assert_not_called()
+    connection.close.assert_called_once()
+    assert manager.pool_stats()["open"] == 0
+
+def test_pool_stats():
+    response = client.get("/pool/stats")
+
+    assert response.status_code == 200
+    assert {"in_use", "waiting", "avg_wait_seconds"} <= response.json().keys()
+
+def test_pool_checkout_times_out_when_exhausted():
+    pool = ConnectionPool(MagicMock, size=1, timeout=0.05)
+    connection = pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(connection)
+
+    assert pool.acquire() is connection
+    assert pool.stats()["timeouts"] == 1
+
+def test_pool_drops_connection_after_driver_error():
+    pool = ConnectionPool(MagicMock, size=1)
+
+    with pytest.raises(Error):
+        with pool.connection() as connection:
+            raise mysql.connector.OperationalError("Lost connection to MySQL server")
+
+    connection.close.assert_called_once()
+    assert pool.acquire() is not connection
+    assert pool.stats()["open"] == 1
+
+def test_pool_keeps_connection_after_statement_error():
+    pool = ConnectionPool(MagicMock, size=1)
+
+    with pytest.raises(Error):
+        with pool.connection() as connection:
+            raise mysql.connector.IntegrityError("Duplicate entry '1' for key 'PRIMARY'")
+
+    connection.rollback.assert_called_once()
+    connection.close.assert_not_called()
+    assert pool.acquire() is connection
+
+def test_pool_ends_read_transaction_on_release():
+    pool = ConnectionPool(MagicMock, size=1)
+
+    with pool.connection() as connection:
+        connection.in_transaction = True
+    with pytest.raises(HTTPException):
+        with pool.connection() as connection:
+            raise HTTPException(status_code=404, detail="Book not found.")
+
+    assert connection.rollback.call_count == 2
+    connection.close.assert_not_called()
+
+def test_read_retries_once_after_lost_connection(monkeypatch):
+    dead, alive = MagicMock(), MagicMock()
+    dead.cursor.return_value.__enter__.return_value.execute.side_effect = mysql.connector.OperationalError("MySQL server has gone away")
+    alive.cursor.return_value.__enter__.return_value.fetchone.return_value = (1, "Test Book", "Test Author", None, None)
+    connections = iter([dead, alive])
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: next(connections))
+
+    manager = DatabaseManager()
+
+    assert manager._fetch_book(1)["title"] == "Test Book"
+    dead.close.assert_called_once()
+
+def test_pool_pings_stale_connection():
+    pool = ConnectionPool(MagicMock, size=1, ping_interval=0)
+    with pool.connection() as connection:
+        pass
+
+    assert pool.acquire() is connection
+    connection.ping.assert_called_once_with(reconnect=True, attempts=1, delay=0)
+
+def test_cache_serves_hits_and_invalidates():
+    cache = BookCache(max_size=10)
+    loader = MagicMock(return_value={"id": 1, "title": "Test Book"})
+
+    assert cache.get_or_load(1, loader) == {"id": 1, "title": "Test Book"}
+    assert cache.get_or_load(1, loader) == {"id": 1, "title": "Test Book"}
+    cache.invalidate(1)
+    cache.get_or_load(1, loader)
+
+    assert loader.call_count == 2
+    assert cache.stats()["hits"] == 1
+
+def test_cache_evicts_least_recently_used():
+    cache = BookCache(max_size=2)
+    for book_id in (1, 2, 1, 3):
+        cache.get_or_load(book_id, lambda: {"id": book_id})
+
+    assert cache.stats()["evictions"] == 1
+    loader = MagicMock(return_value={"id": 2})
+    cache.get_or_load(2, loader)
+    loader.assert_called_once()
+
+def test_cache_remembers_not_found():
+    cache = BookCache()
+    loader = MagicMock(side_effect=HTTPException(status_code=404, detail="Book not found."))
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as exc_info:
+            cache.get_or_load(99, loader)
+        assert exc_info.value.status_code == 404
+
+    loader.assert_called_once()
+    assert cache.stats()["negative_hits"] == 2
+
+def test_cache_coalesces_concurrent_misses():
+    cache = BookCache()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return {"id": 5}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(cache.get_or_load, 5, loader) for _ in range(8)]
+        time.sleep(0.05)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert results == [{"id": 5}] * 8
+
+def test_add_books_batch(mock_db_manager):
+    db_manager.add_books = MagicMock(return_value=[
+        {"id": 1, "status": 201, "message": "Book added successfully."},
+        {"id": 2, "status": 409, "message": "Book already exists."}
+    ])
+    response = client.post("/books/batch", json=[
+        {"id": 1, "title": "Test Book", "author": "Test Author"},
+        {"id": 2, "title": "Another Book", "author": "Another Author"}
+    ])
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == [201, 409]
+    books, = db_manager.add_books.call_args.args
+    assert [book.id for book in books] == [1, 2]
+    assert db_manager.add_books.call_args.kwargs == {"upsert": False}
+
+def test_add_books_checks_existing_ids_under_lock(monkeypatch):
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [(1,)]
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: connection)
+
+    results = DatabaseManager().add_books([BookRecord(id=1, title="A", author="B"), BookRecord(id=2, title="C", author="D")])
+
+    assert [result["status"] for result in results] == [409, 201]
+    assert cursor.execute.call_args_list[0].args[0].endswith("FOR UPDATE")
+    connection.commit.assert_called_once()
+
+def test_write_to_missing_book_keeps_table_version(monkeypatch):
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value.rowcount = 0
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: connection)
+    manager = DatabaseManager()
+    version = manager.table_version.value
+
+    with pytest.raises(HTTPException) as excinfo:
+        manager.delete_book_by_id(424242)
+
+    assert excinfo.value.status_code == 404
+    assert manager.table_version.value == version
+
+def test_get_books_batch(mock_db_manager):
+    db_manager.get_books_by_ids = MagicMock(return_value=[
+        {"id": 1, "status": 200, "book": {"id": 1, "title": "Test Book", "author": "Test Author", "published_date": None, "genre": None}},
+        {"id": 9, "status": 404, "message": "Book not found."}
+    ])
+    response = client.get("/books/batch?ids=1&ids=9")
+
+    assert response.status_code == 200
+    db_manager.get_books_by_ids.assert_called_once_with([1, 9])
+
+def test_delete_books_batch_rejects_oversized_batch(mock_db_manager):
+    db_manager.delete_books_by_ids = MagicMock()
+    query = "&".join(f"ids={i}" for i in range(MAX_BATCH_SIZE + 1))
+    response = client.delete(f"/books/batch?{query}")
+
+    assert response.status_code == 400
+    db_manager.delete_books_by_ids.assert_not_called()
+
+def test_profiler_samples_on_demand_per_route_template(tmp_path, mock_db_manager):
+    inner_app = FastAPI()
+    inner_app.include_router(router)
+    profiled_app = PyInstrumentMiddleware(inner_app, sample_rate=0, output_dir=str(tmp_path))
+    profiled_client = TestClient(profiled_app)
+
+    profiled_client.get("/books/1")
+    profiled_client.get("/books/1", headers={"X-Profile": "1"})
+    profiled_client.get("/books/2?profile=1")
+    profiled_client.get("/no/such/path/1?profile=1")
+    profiled_client.get("/no/such/path/2?profile=1")
+    profiled_app.flush()
+
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert [name.split(".")[0] for name in names] == ["memory_profile__books_{book_id}", "memory_profile_unmatched"]
+    assert all(name.endswith(".speedscope.json") for name in names)
+    report = json.loads((tmp_path / names[0]).read_text())
+    assert report["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+
+def test_profiler_writes_and_resets_each_window(tmp_path, mock_db_manager):
+    inner_app = FastAPI()
+    inner_app.include_router(router)
+    profiled_app = PyInstrumentMiddleware(inner_app, sample_rate=1, output_dir=str(tmp_path), window_samples=2)
+    profiled_client = TestClient(profiled_app)
+
+    for book_id in (1, 2, 3):
+        profiled_client.get(f"/books/{book_id}")
+    profiled_app._executor.submit(lambda: None).result()
+
+    # The first window closed after two samples; the third sample starts a new one
+    assert len(list(tmp_path.iterdir())) == 1
+    assert profiled_app._windows["/books/{book_id}"][1] == 1
+    profiled_app.flush()
+    assert len(list(tmp_path.iterdir())) == 2
+    assert profiled_app._windows == {}
+
+def test_setup_logging_is_idempotent():
+    logger = setup_logging()
+    handler_count = len(logger.handlers)
+
+    assert setup_logging() is logger
+    assert len(logger.handlers) == handler_count
+    assert sum(isinstance(handler, QueueHandler) for handler in logger.handlers) == 1
+
+def test_rate_limit_filter_drops_hot_info_lines():
+    rate_limit = RateLimitFilter(rate=0.001, burst=2)
+
+    def record(level, lineno=10):
+        return logging.LogRecord("LibraryManager", level, "service.py", lineno, "Book retrieved", None, None)
+
+    assert [rate_limit.filter(record(logging.INFO)) for _ in range(4)] == [True, True, False, False]
+    assert rate_limit.filter(record(logging.INFO, lineno=11))
+    assert rate_limit.filter(record(logging.WARNING))
+
+def test_database_manager_against_sqlite_stand_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: bench_backend.Connection(str(tmp_path / "books.sqlite3")))
+    manager = DatabaseManager()
+    manager.create_table()
+
+    manager.add_books([BookRecord(id=book_id, title=f"Book {book_id}", author="Author") for book_id in (1, 2, 3)])
+    manager.update_book_by_id(2, Book(title="Book 2b", author="Author"))
+    manager.delete_book_by_id(3)
+
+    assert manager.get_book_by_id(2)["title"] == "Book 2b"
+    assert [book["id"] for book in manager.display_all_books(limit=10, after=0)] == [1, 2]
+    assert [book["id"] for book in manager.stream_all_books(chunk_size=1)] == [1, 2]
+    with pytest.raises(HTTPException):
+        manager.get_book_by_id(3)
+
+def test_group_commit_against_sqlite_stand_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: bench_backend.Connection(str(tmp_path / "books.sqlite3")))
+    monkeypatch.setenv("WriteBehind", "1")
+    monkeypatch.setenv("GroupCommitMaxDelayMs", "200")
+    manager = DatabaseManager()
+    manager.create_table()
+    manager.add_books([BookRecord(id=5, title="Book 5", author="Author")])
+    batch_sizes = []
+    write_batch = manager.group_commit.run_batch
+    manager.group_commit.run_batch = lambda operations: batch_sizes.append(len(operations)) or write_batch(operations)
+
+    def add(book_id):
+        try:
+            return manager.add_book(book_id, Book(title=f"Book {book_id}", author="Author"))
+        except Error as e:
+            return type(e).__name__
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        added = list(executor.map(add, range(1, 6)))
+    with pytest.raises(HTTPException) as excinfo:
+        manager.update_book_by_id(99, Book(title="Missing", author="Author"))
+
+    # The duplicate of book 5 fails on its own; the rest of its batch still commits
+    assert added == [{"message": "Book added successfully."}] * 4 + ["IntegrityError"]
+    assert batch_sizes == [5, 1]
+    assert excinfo.value.status_code == 404
+    assert manager.delete_book_by_id(1) == {"message": "Book deleted successfully."}
+    assert [book["id"] for book in manager.display_all_books(limit=10)] == [2, 3, 4, 5]
+
+def test_group_commit_fails_whole_batch_once_on_connection_error(monkeypatch):
+    connection = MagicMock()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.execute.side_effect = mysql.connector.OperationalError("Lost connection to MySQL server")
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: connection)
+
+    with pytest.raises(mysql.connector.OperationalError):
+        DatabaseManager()._write_batch([("delete", book_id, None) for book_id in range(5)])
+
+    assert cursor.execute.call_count == 1
+
+def test_benchmark_flags_regressions():
+    baseline = {"results": [{"router": "sync", "middleware": "none", "scenario": "read", "throughput_rps": 100.0, "p95_ms": 10.0, "errors": 0}]}
+    current = [{"router": "sync", "middleware": "none", "scenario": "read", "throughput_rps": 70.0, "p95_ms": 11.0, "errors": 0}]
+
+    assert len(compare(current, baseline, tolerance=0.2)) == 1
+    assert compare(current, baseline, tolerance=0.5) == []
+
+def test_display_books_passes_filters(mock_db_manager):
+    response = client.get("/books/?author=Test%20Author&title_prefix=Te&published_from=2020-01-01&sort=title&order=desc&limit=2")
+
+    assert response.status_code == 200
+    filters = db_manager.display_all_books.call_args.kwargs["filters"]
+    assert filters == BookFilter(author="Test Author", title_prefix="Te", published_from="2020-01-01", sort="title", order="desc")
+    assert response.headers["X-Next-Cursor"] != "2"
+
+def test_build_list_query_uses_indexed_predicates():
+    query, params = build_list_query(BookFilter(genre="Fiction", title_prefix="50%_off", q="hobbit"), limit=10, after=5)
+
+    assert query == (
+        "SELECT * FROM books WHERE genre = %s AND title LIKE %s ESCAPE '!' "
+        "AND MATCH(title, author) AGAINST (%s IN NATURAL LANGUAGE MODE) AND id > %s ORDER BY id ASC LIMIT %s"
+    )
+    assert params == ["Fiction", "50!%!_off%", "hobbit", 5, 10]
+
+def test_search_books_against_sqlite_stand_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: bench_backend.Connection(str(tmp_path / "books.sqlite3")))
+    manager = DatabaseManager()
+    manager.create_table()
+    manager.add_books([
+        BookRecord(id=1, title="Dune", author="Herbert", published_date="1965-08-01", genre="SF"),
+        BookRecord(id=2, title="Emma", author="Austen", published_date="1815-12-23", genre="Classic"),
+        BookRecord(id=3, title="Dracula", author="Stoker", published_date=None, genre="Classic"),
+        BookRecord(id=4, title="Persuasion", author="Austen", published_date="1817-12-20", genre="Classic"),
+    ])
+
+    def ids(**kwargs):
+        return [book["id"] for book in manager.display_all_books(**kwargs)]
+
+    assert ids(filters=BookFilter(author="Austen")) == [2, 4]
+    assert ids(filters=BookFilter(title_prefix="D")) == [1, 3]
+    assert ids(filters=BookFilter(q="Stoker")) == [3]
+    assert ids(filters=BookFilter(published_from="1816-01-01", published_to="1970-01-01")) == [1, 4]
+
+    by_date = BookFilter(sort="published_date", order="desc")
+    first_page = manager.display_all_books(limit=2, filters=by_date)
+    assert [book["id"] for book in first_page] == [1, 4]
+    assert ids(limit=2, filters=by_date, cursor=next_cursor(first_page, 2, by_date)) == [2, 3]
+
+def test_get_book_not_modified(mock_db_manager):
+    etag = client.get("/books/1").headers["ETag"]
+
+    response = client.get("/books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # A write elsewhere in the table leaves this book, and so its ETag, as it was
+    db_manager.table_version.bump()
+    assert client.get("/books/1", headers={"If-None-Match": etag}).status_code == 304
+
+    db_manager.get_book_by_id.return_value = {"id": 1, "title": "Renamed", "author": "Test Author", "published_date": "2023-01-01", "genre": "Fiction"}
+    db_manager.table_version.bump()
+    assert client.get("/books/1", headers={"If-None-Match": etag}).status_code == 200
+
+def test_display_books_if_modified_since(mock_db_manager):
+    last_modified = client.get("/books/").headers["Last-Modified"]
+
+    assert client.get("/books/", headers={"If-Modified-Since": last_modified}).status_code == 304
+    db_manager.table_version.bump()
+    assert client.get("/books/", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    db_manager.display_all_books.return_value = []
+    db_manager.table_version.bump()
+    assert client.get("/books/", headers={"If-Modified-Since": last_modified}).status_code == 200
+
+def test_display_books_serves_cached_page(mock_db_manager):
+    first = client.get("/books/?genre=Fiction")
+    second = client.get("/books/?genre=Fiction")
+
+    assert first.content == second.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    db_manager.display_all_books.assert_called_once()
+
+def test_fast_json_response_serializes_dates():
+    response = FastJSONResponse({"id": 1, "published_date": date(2023, 1, 1)})
+
+    assert json.loads(response.body) == {"id": 1, "published_date": "2023-01-01"}
+
+def test_response_cache_derives_validators_from_content():
+    pages = ResponseCache(max_age=0.05)
+    _, headers = pages.put("/books/", 1, b"[]")
+
+    assert pages.get("/books/", 1) == (b"[]", headers)
+    assert pages.get("/books/", 2) is None
+    # Same body under a new version: same validators, on any cache that stores it
+    assert pages.put("/books/", 2, b"[]")[1] == headers
+    assert ResponseCache().put("/books/", 7, b"[]")[1]["ETag"] == headers["ETag"]
+    time.sleep(0.06)
+    assert pages.get("/books/", 2) is None
+
+    _, changed = pages.put("/books/", 2, b'[{"id":1}]')
+    assert changed["ETag"] != headers["ETag"]
+    assert parsedate_to_datetime(changed["Last-Modified"]) > parsedate_to_datetime(headers["Last-Modified"])